@@ -10,6 +10,21 @@ if [ -z "$DB_NAME" ] || [ -z "$DB_USER" ] || [ -z "$DB_PASS" ]; then
   exit 1
 fi
 
+# Extensions are created in the same psql session as the database, instead of one connection per extension
+EXTENSION_STATEMENTS=""
+for ext in "${@:3}"
+do
+  # Postgres folds unquoted identifiers to lowercase anyway
+  ext="${ext,,}"
+  # The statements are fed to psql on stdin, so anything but a plain identifier could smuggle in psql meta-commands
+  if [[ ! "$ext" =~ ^[a-z0-9_]+$ ]]; then
+    echo "Invalid extension name '$ext'. Allowed a-z0-9_"
+    exit 1
+  fi
+  echo "Creating extension $ext in database $DB_NAME"
+  EXTENSION_STATEMENTS+="CREATE EXTENSION IF NOT EXISTS $ext CASCADE;"$'\n'
+done
+
 psql -d postgres <<EOF
 CREATE DATABASE $DB_NAME;
 CREATE USER $DB_USER WITH ENCRYPTED PASSWORD '$DB_PASS';
@@ -18,11 +33,6 @@ ALTER DATABASE $DB_NAME OWNER TO $DB_USER;
 \c $DB_NAME $PG_ADMIN_USER_USERNAME
 ALTER SCHEMA public OWNER TO $DB_USER;
 GRANT ALL ON SCHEMA public TO $DB_USER;
+\set ON_ERROR_STOP on
+$EXTENSION_STATEMENTS
 EOF
-
-for ext in "${@:3}"
-do
-  echo "Creating extension $ext in database $DB_NAME"
-  psql -U "$PG_ADMIN_USER_USERNAME" -d "$DB_NAME" -c "CREATE EXTENSION IF NOT EXISTS $ext CASCADE;"
-done
-
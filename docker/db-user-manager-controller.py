@@ -1,34 +1,41 @@
 import os
 import sys
 import subprocess
-import time
 import threading
+import time
 import re as regex
 import secrets
 import string
 import logging
+import logging.handlers
+import atexit
 import traceback
-import base64
 import signal
+import queue
+import functools
+import collections
+import selectors
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
 
-from kubernetes import client, config, watch
+import orjson
+import urllib3
+from kubernetes import client, config
 from kubernetes.client.rest import ApiException
 from datetime import datetime, timezone
 
-log_level = logging.INFO
-
-if os.environ.get('LOG_LEVEL'):
-    match os.environ.get('LOG_LEVEL'):
-        case "DEBUG":
-            log_level = logging.DEBUG
-        case "INFO":
-            log_level = logging.INFO
-        case "WARNING":
-            log_level = logging.WARNING
-        case "ERROR":
-            log_level = logging.ERROR
-        case "CRITICAL":
-            log_level = logging.CRITICAL
+LOG_LEVELS = {
+    "DEBUG": logging.DEBUG,
+    "INFO": logging.INFO,
+    "WARNING": logging.WARNING,
+    "ERROR": logging.ERROR,
+    "CRITICAL": logging.CRITICAL
+}
+log_level = LOG_LEVELS.get(os.environ.get('LOG_LEVEL'), logging.INFO)
+
+# DB hosts written into the generated secrets. Read once, they do not change while the controller runs
+PG_HOST = os.environ.get('PGHOST')
+MYSQL_HOST = os.environ.get('MYSQL_HOST')
 
 log = logging.getLogger(__name__)
 logging.getLogger().setLevel(log_level)
@@ -38,17 +45,32 @@ handler.setLevel(log_level)
 # [%(asctime)s] [%(name)s]
 formatter = logging.Formatter('[%(levelname)s] %(message)s')
 handler.setFormatter(formatter)
-log.addHandler(handler)
 
-def update_request_status(request, phase, message=None):
+# Optionally keep the controller on one CPU. On Linux the affinity only applies to the calling thread and the threads
+# it starts afterwards, so it is set before the first thread (the log listener below) is started. Logged by main()
+PIN_CPU = os.environ.get('PIN_CPU')
+pin_cpu_error = None
+if PIN_CPU:
+    try:
+        os.sched_setaffinity(0, {int(PIN_CPU)})
+    except (AttributeError, ValueError, OSError) as e:
+        pin_cpu_error = e
+
+# Records are written to stderr by a background thread, so logging never blocks the processing threads
+log_queue = queue.Queue()
+log_listener = logging.handlers.QueueListener(log_queue, handler, respect_handler_level=True)
+log.addHandler(logging.handlers.QueueHandler(log_queue))
+log.propagate = False
+log_listener.start()
+# Drains the queue on every interpreter exit, including sys.exit() from main()
+atexit.register(log_listener.stop)
+
+def update_request_status(namespace, name, phase, message=None):
     """
-    Patch the status subresource of a DbUserRequest.
+    Queue a patch of the status subresource of a DbUserRequest.
     Use this instead of deleting the request so ArgoCD self-heal is preserved.
+    The patch is applied asynchronously by the status WriteBatcher.
     """
-    api = client.CustomObjectsApi()
-    metadata_obj = request.get('metadata', {})
-    name = metadata_obj.get('name')
-    namespace = metadata_obj.get('namespace')
     status_body = {
         "status": {
             "phase": phase,
@@ -56,20 +78,147 @@ def update_request_status(request, phase, message=None):
             "lastUpdated": datetime.now(timezone.utc).isoformat()
         }
     }
+    status_writer.submit((namespace, name), namespace, name, status_body)
+
+def patch_request_status(namespace, name, status_body):
+    """
+    Patch the status subresource of a DbUserRequest.
+
+    Args:
+        namespace: Namespace of the DbUserRequest
+        name: Name of the DbUserRequest
+        status_body: Patch body containing the new status
+    """
     try:
-        api.patch_namespaced_custom_object_status(
+        custom_objects_api.patch_namespaced_custom_object_status(
             group="notepass.de",
             version="v1",
             namespace=namespace,
             plural="dbuserrequests",
             name=name,
-            body=status_body
+            body=status_body,
+            # A half-open connection would otherwise block the flush waiting for this write, and every write after it
+            _request_timeout=(10, 30)
         )
-        log.info(f"Updated status of DbUserRequest '{name}' in '{namespace}' to '{phase}'")
+        log.info("Updated status of DbUserRequest '%s' in '%s' to '%s'", name, namespace, status_body['status']['phase'])
     except ApiException as e:
-        log.error(f"Failed to patch status for {name}/{namespace}: {e}")
+        log.error("Failed to patch status for %s/%s: %s", name, namespace, e)
         raise
 
+class WriteBatcher:
+    """
+    Applies queued API writes from a background thread in batches.
+
+    Writes queued for the same key before the batch is flushed collapse into the latest one.
+    A batch is flushed once max_batch writes are pending or max_wait_ms after the first write
+    arrived, and its writes are sent concurrently so they share the client's connection pool.
+    A failed write is queued again with exponential backoff, unless a newer write for its key was submitted.
+
+    Args:
+        apply_func: Function performing a single write, called with the queued arguments
+        max_batch: Number of pending writes which triggers an immediate flush
+        max_wait_ms: Maximum time a write waits for further writes to join its batch
+        max_workers: Number of writes sent concurrently
+        max_retries: Number of times a failed write is retried before it is dropped
+        on_give_up: Optional function called with the queued arguments of a write that is dropped
+    """
+
+    def __init__(self, apply_func, max_batch=50, max_wait_ms=100, max_workers=8, max_retries=5, on_give_up=None):
+        self.apply_func = apply_func
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self.max_retries = max_retries
+        self.on_give_up = on_give_up
+        # key -> (args, attempt)
+        self.pending = {}
+        # key -> (timer, args, attempt) of the failed write waiting to be queued again. A newer submit() removes it
+        self.retrying = {}
+        self.lock = threading.Lock()
+        self.has_pending = threading.Event()
+        self.is_full = threading.Event()
+        self.stopping = threading.Event()
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="WriteBatcher")
+
+    def submit(self, key, *args):
+        self._enqueue(key, args, 0)
+
+    def _enqueue(self, key, args, attempt, retry=False):
+        with self.lock:
+            if retry:
+                # Only the failed write itself is retried, never one a newer write replaced in the meantime.
+                # The retry runs on the timer thread, which identifies it
+                retrying = self.retrying.get(key)
+                if retrying is None or retrying[0] is not threading.current_thread():
+                    return
+            self.retrying.pop(key, None)
+            # Re-insert so a collapsed write keeps the position of its latest submission
+            self.pending.pop(key, None)
+            self.pending[key] = (args, attempt)
+            if len(self.pending) >= self.max_batch:
+                self.is_full.set()
+        self.has_pending.set()
+
+    def _retry_later(self, key, args, attempt, cause):
+        # Client errors (e.g. the object was deleted) fail the same way again
+        retryable = not (isinstance(cause, ApiException) and cause.status is not None and 400 <= cause.status < 500 and cause.status not in (409, 429))
+        with self.lock:
+            if key in self.pending:
+                log.warning("Batched write for %s failed, a newer write is already queued: %s", key, cause)
+                return
+            give_up = not retryable or attempt >= self.max_retries or self.stopping.is_set()
+            if not give_up:
+                delay = min(30, 2 ** attempt)
+                timer = threading.Timer(delay, self._enqueue, (key, args, attempt + 1, True))
+                timer.daemon = True
+                self.retrying[key] = (timer, args, attempt + 1)
+        if give_up:
+            log.error("Batched write for %s failed, giving up after %s attempts: %s", key, attempt + 1, cause)
+            if self.on_give_up:
+                self.on_give_up(*args)
+            return
+        log.warning("Batched write for %s failed, retrying in %ss: %s", key, delay, cause)
+        # A timer cancelled by stop() before it started never runs
+        timer.start()
+
+    def flush(self):
+        with self.lock:
+            batch, self.pending = self.pending, {}
+            self.has_pending.clear()
+            self.is_full.clear()
+        futures = {key: self.executor.submit(self.apply_func, *args) for key, (args, attempt) in batch.items()}
+        for key, future in futures.items():
+            try:
+                future.result()
+            except Exception as e:
+                args, attempt = batch[key]
+                self._retry_later(key, args, attempt, e)
+
+    def stop(self):
+        """
+        Let run() return after flushing the writes submitted so far, including those waiting for a retry
+        """
+        with self.lock:
+            self.stopping.set()
+            # Retries are not waited for. Their writes get one last attempt in the final flush instead
+            for key, (timer, args, attempt) in self.retrying.items():
+                timer.cancel()
+                self.pending.setdefault(key, (args, attempt))
+            self.retrying.clear()
+        self.has_pending.set()
+        self.is_full.set()
+
+    def run(self):
+        while not self.stopping.is_set():
+            self.has_pending.wait()
+            self.is_full.wait(self.max_wait)
+            self.flush()
+        self.flush()
+        self.executor.shutdown()
+
+PASSWORD_ALPHABET = (string.ascii_letters + string.digits).encode('ascii')
+# Largest multiple of the alphabet size below 256. Bytes above it are rejected to avoid modulo bias
+PASSWORD_BYTE_LIMIT = 256 - 256 % len(PASSWORD_ALPHABET)
+
 def generate_simple_password(length=24):
     """
     Generate a database-safe password
@@ -82,219 +231,678 @@ def generate_simple_password(length=24):
     """
     # Use alphanumeric characters (uppercase, lowercase, digits)
     # Avoid special characters that might cause issues in SQL contexts
-    alphabet = string.ascii_letters + string.digits
-    password = ''.join(secrets.choice(alphabet) for _ in range(length))
-    return password
+    # Draw all random bytes at once from the CSPRNG instead of one call per character
+    password = bytearray()
+    while len(password) < length:
+        password.extend(PASSWORD_ALPHABET[b % len(PASSWORD_ALPHABET)] for b in secrets.token_bytes(length * 2) if b < PASSWORD_BYTE_LIMIT)
+    return password[:length].decode('ascii')
+
+def normalize_request(request):
+    """
+    Derive the values the handlers need from a DbUserRequest once per request
+
+    Args:
+        request: A validated DbUserRequest
 
-def call_create_script(request, password):
-    spec = request.get('spec')
+    Returns:
+        SimpleNamespace: Lowercased db_type and db_name plus the values derived from them
+    """
+    metadata = request.get('metadata', {})
+    spec = request.get('spec', {})
     db_type = spec.get('db_type').lower()
-    db_name = spec.get('db_name').lower()
-
-    extensions = []
-    if db_type == 'mariadb':
-        script_path = 'create-mariadb-user.sh'
-    elif db_type == 'postgres':
-        script_path = 'create-pg-user.sh'
-        pg_options = spec.get('postgres', {})
-        pg_extensions = pg_options.get('extensions')
-        extensions = spec.get('extensions')
-        if pg_extensions and isinstance(pg_extensions, list):
-            extensions = pg_extensions
-    else:
+    db_type_info = DB_TYPES[db_type]
+    extensions = ()
+    if db_type == 'postgres':
+        pg_extensions = (spec.get('postgres') or {}).get('extensions')
+        if isinstance(pg_extensions, list):
+            # Postgres folds unquoted identifiers to lowercase, so PostGIS and postgis are the same extension
+            extensions = tuple(str(extension).lower() for extension in pg_extensions)
+    return SimpleNamespace(
+        namespace=metadata.get('namespace'),
+        name=metadata.get('name'),
+        uid=metadata.get('uid'),
+        db_type=db_type,
+        db_name=spec.get('db_name').lower(),
+        db_type_alt=db_type_info.type_alt,
+        db_host=db_type_info.host,
+        secret_name=spec.get('secret_name'),
+        custom_db_name_prop=spec.get('custom_db_name_prop'),
+        extensions=extensions
+    )
+
+# The DB scripts are shipped next to the controller
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+SCRIPT_TIMEOUT = int(os.environ.get('SCRIPT_TIMEOUT_SECONDS', '60'))
+SCRIPT_OUTPUT_TAIL = 64
+# Default capacity of a Linux pipe, so a single read drains everything the script wrote since the last one.
+# io.DEFAULT_BUFFER_SIZE (8 KiB) would need several reads for a full pipe
+SCRIPT_READ_SIZE = 65536
+# Everything that differs between the supported database types, keyed by the lowercased spec.db_type
+DB_TYPES = {
+    'mariadb': SimpleNamespace(
+        script=os.path.join(SCRIPT_DIR, 'create-mariadb-user.sh'),
+        type_alt='mysql',
+        host=MYSQL_HOST,
+        host_env='MYSQL_HOST'
+    ),
+    'postgres': SimpleNamespace(
+        script=os.path.join(SCRIPT_DIR, 'create-pg-user.sh'),
+        type_alt='postgresql',
+        host=PG_HOST,
+        host_env='PGHOST'
+    )
+}
+
+def kill_process_group(process):
+    # Ask the whole group to stop first, then kill whatever is left after a second
+    for sig in (signal.SIGTERM, signal.SIGKILL):
+        try:
+            os.killpg(process.pid, sig)
+        except ProcessLookupError:
+            break
+        try:
+            process.wait(1)
+        except subprocess.TimeoutExpired:
+            pass
+
+def run_script(cmd, timeout=SCRIPT_TIMEOUT):
+    """
+    Run a DB script and forward its output to the log line by line while it runs
+
+    The script gets its own process group, so the database clients it started are killed with it on timeout.
+    stderr is merged into stdout, so both arrive in order through a single pipe.
+
+    Args:
+        cmd: Path of the script followed by its arguments
+        timeout: Seconds the script may run before it is killed
+
+    Returns:
+        subprocess.CompletedProcess: Exit code and the last SCRIPT_OUTPUT_TAIL lines of the combined output
+    """
+    script_name = os.path.basename(cmd[0])
+    # Every line is logged, only the tail is kept for error messages
+    output = collections.deque(maxlen=SCRIPT_OUTPUT_TAIL)
+    pending = b""
+    deadline = time.monotonic() + timeout
+    timed_out = False
+    # The scripts never read from stdin, so do not hand them the controller's stdin.
+    # Descriptors opened by Python are non-inheritable anyway, so skip closing every other fd in the child
+    with subprocess.Popen(cmd, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, close_fds=False, start_new_session=True) as process, selectors.DefaultSelector() as selector:
+        selector.register(process.stdout, selectors.EVENT_READ)
+        fd = process.stdout.fileno()
+        while True:
+            remaining = deadline - time.monotonic()
+            timed_out = remaining <= 0 or not selector.select(remaining)
+            if timed_out:
+                break
+            # Read whatever the pipe holds at once instead of line sized chunks
+            chunk = os.read(fd, SCRIPT_READ_SIZE)
+            if chunk:
+                *lines, pending = (pending + chunk).split(b"\n")
+            else:
+                lines = [pending] if pending else []
+            for line in lines:
+                line = line.decode(errors='replace')
+                log.info("%s: %s", script_name, line)
+                output.append(line)
+            if not chunk:
+                break
+
+        if not timed_out:
+            try:
+                process.wait(max(0, deadline - time.monotonic()))
+            except subprocess.TimeoutExpired:
+                timed_out = True
+        if timed_out:
+            kill_process_group(process)
+
+    output = "\n".join(output)
+    if timed_out:
+        raise Exception(f"Script {cmd[0]} did not finish within {timeout}s and was killed.\n====[OUTPUT]====\n{output}\n====[END]====")
+    return subprocess.CompletedProcess(cmd, process.returncode, output)
+
+def call_create_script(spec, password):
+    db_type = spec.db_type
+    db_name = spec.db_name
+
+    db_type_info = DB_TYPES.get(db_type)
+    if db_type_info is None:
         raise Exception(f"Unknown database type '{db_type}'.")
+    if not spec.db_host:
+        raise Exception(f"No host configured for database type '{db_type}'. Set {db_type_info.host_env}.")
+    script_path = db_type_info.script
 
-        # Call the script with parameters (pass lowercase db name and generated password)
-    cmd = [script_path, db_name, password]
-    if extensions and isinstance(extensions, list):
-        cmd.extend(str(ext) for ext in extensions)
-    result = subprocess.run(cmd, capture_output=True, text=True)
+    # Call the script with parameters (pass lowercase db name and generated password)
+    cmd = [script_path, db_name, password, *spec.extensions]
+    result = run_script(cmd)
 
     if result.returncode == 0:
-        log.info(f"Successfully called {script_path} to create DB {db_name}. Output:\n====[STDOUT]====\n {result.stdout}\n====[STDERR]====\n{result.stderr}\n====[END]====")
+        log.info("Successfully called %s to create DB %s", script_path, db_name)
         return db_name
     else:
-        raise Exception(f"Script {script_path} returned with exit code {result.returncode}.\n====[STDOUT]====\n {result.stdout}\n====[STDERR]====\n{result.stderr}\n====[END]====")
+        raise Exception(f"Script {script_path} returned with exit code {result.returncode}.\n====[OUTPUT]====\n{result.stdout}\n====[END]====")
 
-def create_crd_resource(group, version, namespace, plural, body):
+def stream_watch_events(list_func, *args, on_open=None, **kwargs):
     """
-    Create a custom resource from a CRD
+    Open a WATCH through a list function of the kubernetes client and yield its events.
+
+    The newline delimited JSON stream is parsed directly with orjson. Unlike watch.Watch, no object is
+    run through the client's model deserializer, as the controller only reads a few plain dict fields.
 
     Args:
-        group: API group of the CRD
-        version: API version of the CRD
-        namespace: Kubernetes namespace
-        plural: Plural name of the CRD
-        body: Resource definition as a dictionary
-    """
-    api_instance = client.CustomObjectsApi()
+        list_func: List function of the kubernetes client for the watched resource
+        args: Positional arguments passed to list_func
+        on_open: Optional function called with the HTTP response once the watch is open
+        kwargs: Keyword arguments passed to list_func
 
+    Returns:
+        Generator of watch events as dicts with the keys 'type' and 'object'
+    """
+    response = list_func(*args, watch=True, _preload_content=False, **kwargs)
+    if on_open:
+        on_open(response)
     try:
-        response = api_instance.create_namespaced_custom_object(
-            group=group,
-            version=version,
-            namespace=namespace,
-            plural=plural,
-            body=body
-        )
-        return response
-    except ApiException as e:
-        raise Exception(f"Exception when creating custom resource: {e}")
+        pending = b""
+        for chunk in response.stream(amt=None, decode_content=True):
+            pending += chunk
+            *lines, pending = pending.split(b"\n")
+            for line in lines:
+                if not line.strip():
+                    continue
+                event = orjson.loads(line)
+                if event.get('type') == 'ERROR':
+                    status = event.get('object', {})
+                    raise ApiException(status=status.get('code'), reason=f"{status.get('reason')}: {status.get('message')}")
+                yield event
+    finally:
+        response.close()
+        response.release_conn()
 
-def create_custom_object_watch(plural):
-    try:
-        api_instance = client.CustomObjectsApi()
-        return watch.Watch().stream(
-            api_instance.list_custom_object_for_all_namespaces,
-            "notepass.de",
-            "v1",
-            plural
-        )
-    except Exception as e:
-        raise Exception(f"Could not create a watch for notepass.de:{plural}:v1. Reason: {e}")
+WATCH_TIMEOUT = 300
+
+class InformerCache:
+    """
+    Local, watch-maintained copy of a resource kind, keyed by (namespace, name).
+
+    The cache is seeded by a paginated LIST (or a WatchList stream) and then kept up to date by a WATCH that resumes
+    from the last seen resourceVersion (including bookmarks), so lookups never hit the API server.
+
+    Args:
+        kind: Human readable name of the watched resource, used for logging
+        list_func: Cluster wide list function of the kubernetes client for the resource, with the arguments
+            identifying the resource already bound (e.g. through functools.partial)
+        transform: Optional function reducing a stored object to the fields lookups need
+        event_queue: Optional queue.Queue which receives every ADDED/MODIFIED/DELETED event
+        watch_list: Sync the initial state via a WatchList stream instead of a LIST (needs Kubernetes 1.27+)
+        field_selector: Optional field selector applied server side to the LIST and WATCH requests
+        label_selector: Optional label selector applied server side to the LIST and WATCH requests
+        list_headers: Optional HTTP headers sent with the LIST requests
+        watch_headers: Optional HTTP headers sent with the WATCH requests
+    """
+
+    def __init__(self, kind, list_func, transform=None, event_queue=None, watch_list=False, field_selector=None, label_selector=None, list_headers=None, watch_headers=None):
+        self.kind = kind
+        self.list_func = list_func
+        self.transform = transform
+        self.event_queue = event_queue
+        self.watch_list = watch_list
+        self.field_selector = field_selector
+        self.label_selector = label_selector
+        self.list_headers = list_headers
+        self.watch_headers = watch_headers
+        self.store = {}
+        # Handler threads write created objects through while the informer thread updates the store
+        self.lock = threading.Lock()
+        self.resource_version = None
+        # Set until the state was (re)listed. A relist keeps the last resourceVersion, so the cache never goes back in time
+        self.needs_sync = True
+        self.synced = threading.Event()
+        self.response = None
+
+    def get(self, namespace, name):
+        return self.store.get((namespace, name))
+
+    def _set_response(self, response):
+        self.response = response
+
+    def stop(self):
+        """
+        Abort the running watch, so run() returns without waiting for the watch timeout
+        """
+        # Release threads still waiting for the initial sync
+        self.synced.set()
+        response = self.response
+        if response is not None:
+            # shutdown() unblocks a read in progress on another thread. Older urllib3 versions only offer close()
+            getattr(response, 'shutdown', response.close)()
+
+    def put(self, obj):
+        key, value = self._key_and_value(obj)
+        with self.lock:
+            self.store[key] = value
+        return key
+
+    def _remove(self, key):
+        with self.lock:
+            return self.store.pop(key, None)
+
+    @staticmethod
+    def _request_options(headers):
+        # The client adds its default headers to the dict it is given, so every request gets its own copy
+        return {"_headers": dict(headers)} if headers else {}
+
+    def _key_and_value(self, obj):
+        # Reduce objects as they arrive, so a sync never holds more than the transformed objects
+        metadata_obj = obj.get('metadata', {})
+        return (metadata_obj.get('namespace'), metadata_obj.get('name')), self.transform(obj) if self.transform else obj
+
+    def _emit(self, event_type, obj):
+        if self.event_queue is not None:
+            self.event_queue.put({"type": event_type, "object": obj})
+
+    def _written_after(self, value, resource_version):
+        # resourceVersions are meant to be opaque, but are increasing etcd revisions in practice. One that does not
+        # parse counts as older, so the object is dropped like any other missing from the snapshot
+        try:
+            return int(value.get('metadata', {}).get('resourceVersion')) > int(resource_version)
+        except (TypeError, ValueError):
+            return False
+
+    def _replace(self, items):
+        # Only report changes compared to the previous state, so a relist does not replay everything.
+        # Objects written through by put() after the snapshot was taken are kept, the watch confirms them later
+        with self.lock:
+            removed = [self.store.pop(key) for key in list(self.store) if key not in items and not self._written_after(self.store[key], self.resource_version)]
+            added = [item for key, item in items.items() if key not in self.store]
+            self.store.update(items)
+        for obj in removed:
+            self._emit("DELETED", obj)
+        for item in added:
+            self._emit("ADDED", item)
+
+        log.info("Synced %s %s at resourceVersion %s", len(items), self.kind, self.resource_version)
+        self.needs_sync = False
+        self.synced.set()
+
+    def _list(self):
+        items = {}
+        _continue = None
+        # Both let the API server answer from its watch cache instead of a quorum read from etcd. The first list
+        # takes any state ("0"), a relist one at least as new as the cache. Continued pages must not set them
+        if self.resource_version:
+            first_page = {"resource_version": self.resource_version, "resource_version_match": "NotOlderThan"}
+        else:
+            first_page = {"resource_version": "0"}
+        while True:
+            response = self.list_func(
+                field_selector=self.field_selector,
+                label_selector=self.label_selector,
+                limit=500,
+                _continue=_continue,
+                _preload_content=False,
+                **({} if _continue else first_page),
+                **self._request_options(self.list_headers)
+            )
+            page = orjson.loads(response.data)
+            items.update(map(self._key_and_value, page.get('items', [])))
+            _continue = page.get('metadata', {}).get('continue')
+            if not _continue:
+                self.resource_version = page.get('metadata', {}).get('resourceVersion')
+                break
+        self._replace(items)
+
+    def _watch(self):
+        initial_items = None
+        if self.needs_sync:
+            # WatchList: the current state is streamed as ADDED events and terminated by a bookmark
+            # carrying the k8s.io/initial-events-end annotation, instead of being returned by one big LIST
+            initial_items = {}
+            kwargs = {"send_initial_events": True, "resource_version_match": "NotOlderThan"}
+            if self.resource_version:
+                kwargs["resource_version"] = self.resource_version
+        else:
+            kwargs = {"resource_version": self.resource_version}
+
+        for event in stream_watch_events(
+                self.list_func,
+                field_selector=self.field_selector,
+                label_selector=self.label_selector,
+                allow_watch_bookmarks=True,
+                timeout_seconds=WATCH_TIMEOUT,
+                # The API server ends the watch after WATCH_TIMEOUT and sends bookmarks in between. A read that
+                # stays silent for longer means the connection died without being closed
+                _request_timeout=(10, WATCH_TIMEOUT + 30),
+                on_open=self._set_response,
+                **self._request_options(self.watch_headers),
+                **kwargs):
+            event_type = event.get('type')
+            obj = event.get('object', {})
+            metadata_obj = obj.get('metadata', {})
+            if initial_items is not None:
+                if event_type == 'BOOKMARK' and metadata_obj.get('annotations', {}).get('k8s.io/initial-events-end') == 'true':
+                    self.resource_version = metadata_obj.get('resourceVersion')
+                    self._replace(initial_items)
+                    initial_items = None
+                elif event_type == 'ADDED':
+                    key, value = self._key_and_value(obj)
+                    initial_items[key] = value
+                continue
+
+            self.resource_version = metadata_obj.get('resourceVersion', self.resource_version)
+            if event_type == 'BOOKMARK':
+                continue
+            if event_type == 'DELETED':
+                self._remove((metadata_obj.get('namespace'), metadata_obj.get('name')))
+            else:
+                self.put(obj)
+            self._emit(event_type, obj)
+
+    def _backoff(self, failures, cause):
+        delay = min(30, 2 ** failures)
+        log.warning("Watch on %s failed, resuming from resourceVersion %s in %ss: %s", self.kind, self.resource_version, delay, cause)
+        shutdown_event.wait(delay)
+        return failures + 1
+
+    def run(self):
+        log.info("Starting informer for %s", self.kind)
+        failures = 0
+        # Nothing ends the informer but a shutdown. Unexpected errors are retried like a failed watch,
+        # as the processor waits for the sync and lookups would otherwise go stale without notice
+        while not shutdown_event.is_set():
+            try:
+                if self.needs_sync and not self.watch_list:
+                    self._list()
+                self._watch()
+                failures = 0
+            except ApiException as e:
+                if self.watch_list and self.needs_sync and e.status in (400, 422):
+                    log.warning("API server does not support WatchList for %s, falling back to LIST: %s", self.kind, e.reason)
+                    self.watch_list = False
+                elif self.field_selector and e.status == 400 and "field label not supported" in f"{e.reason} {e.body}":
+                    # Only the missing selectable field is worked around, a malformed label selector fails as before
+                    log.warning("API server rejected field selector '%s' for %s, watching unfiltered: %s", self.field_selector, self.kind, e.reason)
+                    self.field_selector = None
+                    self.needs_sync = True
+                elif e.status == 410:
+                    log.info("Watch on %s expired, relisting", self.kind)
+                    self.needs_sync = True
+                else:
+                    failures = self._backoff(failures, e)
+            except (urllib3.exceptions.HTTPError, OSError) as e:
+                if shutdown_event.is_set():
+                    break
+                # Connection problems keep the resourceVersion, so the watch resumes without a relist
+                failures = self._backoff(failures, e)
+            except Exception as e:
+                if shutdown_event.is_set():
+                    break
+                if log.isEnabledFor(logging.DEBUG):
+                    log.debug("Trace:\n%s", traceback.format_exc())
+                failures = self._backoff(failures, e)
+
+def secret_resource_version_only(secret):
+    """
+    Reduce a cached Secret to its resourceVersion. Lookups only need to know the secret exists, and the rest of
+    its metadata may hold the secret's data (e.g. in the kubectl last-applied-configuration annotation)
+    """
+    return {"metadata": {"resourceVersion": secret.get('metadata', {}).get('resourceVersion')}}
+
+def prune_request(request):
+    """
+    Drop the bookkeeping fields of a DbUserRequest the controller never reads, so they are not kept in the cache
+
+    Args:
+        request: DbUserRequest as decoded from the API server. Modified in place
+
+    Returns:
+        dict: The same request without managedFields and the last-applied-configuration annotation
+    """
+    metadata_obj = request.get('metadata', {})
+    metadata_obj.pop('managedFields', None)
+    annotations = metadata_obj.get('annotations')
+    if annotations:
+        annotations.pop('kubectl.kubernetes.io/last-applied-configuration', None)
+    return request
+
+request_queue = queue.Queue()
+request_informer = None
+secret_informer = None
+status_writer = None
+# uids of the DbUserRequests handed to a worker. Kept until the informer reports the request left Pending
+handled_requests = set()
+
+def claim_request(uid):
+    """
+    Record that a DbUserRequest is being processed, so further events for it are skipped while it is Pending
+
+    Args:
+        uid: metadata.uid of the DbUserRequest
+    """
+    handled_requests.add(uid)
+
+def release_request(uid):
+    handled_requests.discard(uid)
+
+def release_request_of_status(namespace, name, status_body):
+    """
+    Release the claim of a DbUserRequest whose status could not be written, so the request is not left claimed
+    while it stays Pending. It is processed again on its next ADDED event
+    """
+    request = request_informer.get(namespace, name)
+    if request:
+        release_request(request.get('metadata', {}).get('uid'))
 
 def find_existing_secret(name, namespace):
     """
     Find an existing Kubernetes Secret by name in the given namespace.
 
+    The lookup is served from the local secret informer cache instead of the API server.
+
     Args:
         name: Name of the Secret resource to look up
         namespace: Namespace where the Secret resource should reside
 
     Returns:
-        The V1Secret object if found, otherwise None.
+        The cached resourceVersion of the Secret if found, otherwise None.
     """
-    v1 = client.CoreV1Api()
-    try:
-        secret = v1.read_namespaced_secret(name=name, namespace=namespace)
-        return secret
-    except ApiException as e:
-        if hasattr(e, 'status') and e.status == 404:
-            return None
-        raise Exception(f"Exception when retrieving Secret '{name}' in namespace '{namespace}': {e}")
-
-def create_secret_for_request(request, password):
-    metadata_obj = request.get('metadata')
-    spec = request.get('spec')
-    is_pg = spec.get('db_type').lower() == 'postgres'
-
-    db_type_alt = 'postgresql' if is_pg else 'mysql'
-    db_host = os.environ['PGHOST'] if is_pg else os.environ['MYSQL_HOST']
+    return secret_informer.get(namespace, name)
 
+def create_secret_for_request(spec, password):
     values = {
-        "dbDb": spec.get('db_name').lower(),
-        "dbHost": db_host,
+        "dbDb": spec.db_name,
+        "dbHost": spec.db_host,
         "dbPass": password,
         "dbSchema": "public",
-        "dbType": spec.get('db_type').lower(),
-        "dbTypeAlt": db_type_alt,
-        "dbUser": spec.get('db_name').lower()
+        "dbType": spec.db_type,
+        "dbTypeAlt": spec.db_type_alt,
+        "dbUser": spec.db_name
     }
 
-    if spec.get('custom_db_name_prop'):
-        values["dbTypeCustom"] = spec.get('custom_db_name_prop')
+    if spec.custom_db_name_prop:
+        values["dbTypeCustom"] = spec.custom_db_name_prop
 
-    create_secret(values, spec.get('secret_name'), metadata_obj.get('namespace'))
+    create_secret(values, spec.secret_name, spec.namespace)
 
 def create_secret(values, name, namespace):
-    log.info(f"Creating DB user secret '{name}' in '{namespace}'")
+    log.info("Creating DB user secret '%s' in '%s'", name, namespace)
 
-    encoded_values = {}
-    for key, value in values.items():
-        encoded_values[key] = base64.b64encode(value.encode("utf-8")).decode('utf-8')
+    # A plain dict is sent as is, without building and serializing client models
+    secret = {
+        "apiVersion": "v1",
+        "kind": "Secret",
+        "metadata": {"name": name, "namespace": namespace},
+        "type": "Opaque",
+        # stringData is base64 encoded into data by the API server, so no client side encoding is needed
+        "stringData": values
+    }
 
-    secret = client.V1Secret(
-        api_version='v1',
-        kind='Secret',
-        metadata=client.V1ObjectMeta(
-            name=name,
-            namespace=namespace
-        ),
-        type='Opaque',
-        data=encoded_values
-    )
+    try:
+        # Only the resourceVersion of the response is needed, so skip deserializing it into a V1Secret
+        response = core_v1_api.create_namespaced_secret(namespace=namespace, body=secret, field_manager="db-user-manager-controller", _preload_content=False)
+        created = orjson.loads(response.data)
+    except ApiException as e:
+        # The cache lookup said the secret did not exist, so it was created in the meantime. The create call
+        # is atomic, so an existing secret is never overwritten with credentials for the new user
+        if e.status == 409:
+            raise Exception(f"Secret '{name}' in '{namespace}' was created by someone else while the DB user was being created. The new credentials were not stored")
+        raise
+    # Make the secret visible to the next request right away, without waiting for the watch event.
+    # namespace and name only form the cache key, the transform stores just the resourceVersion
+    secret_informer.put({"metadata": {"namespace": namespace, "name": name, "resourceVersion": created.get('metadata', {}).get('resourceVersion')}})
+    log.info("Secret '%s' in '%s' created", name, namespace)
+
+HANDLER_CONCURRENCY = int(os.environ.get('HANDLER_CONCURRENCY', '4'))
+# Comma separated namespaces to handle requests from. Empty handles all. Still one cluster wide watch
+WATCH_NAMESPACES = frozenset(filter(None, (ns.strip() for ns in os.environ.get('WATCH_NAMESPACES', '').split(','))))
+# Fixed set of locks picked by the hash of (namespace, secret name), so two requests for the same secret are never
+# processed at the same time. Unrelated secrets rarely share a lock, and the set does not grow with the requests seen
+secret_locks = tuple(threading.Lock() for _ in range(64))
 
-    client.CoreV1Api().create_namespaced_secret(namespace=namespace, body=secret)
-    log.info(f"Secret '{name}' in '{namespace}' created")
+def process_request(spec):
+    """
+    Create the DB user and the secret for a validated DbUserRequest and report the result in its status
+
+    Args:
+        spec: Normalized request as returned by validate_user_request
+    """
+    secret_lock = secret_locks[hash((spec.namespace, spec.secret_name)) % len(secret_locks)]
+    try:
+        with secret_lock:
+            # TODO: Also checkk if the secret already exists. Creation order is secret -> dbuser -> delete request!
+            if find_existing_secret(spec.secret_name, spec.namespace):
+                msg = f"Secret with name '{spec.secret_name}' already exists, skipping creating of new DB/User. Will skip request."
+                log.info(msg)
+                update_request_status(spec.namespace, spec.name, "Fulfilled", msg)
+            else:
+                password = generate_simple_password()
+                db_name_and_username = call_create_script(spec, password)
+                create_secret_for_request(spec, password)
+                msg = f"DbUser for DB {db_name_and_username} with username {db_name_and_username} successfully created. Credentials stored in secret {spec.secret_name}."
+                log.info(msg)
+                update_request_status(spec.namespace, spec.name, "Fulfilled", msg)
+    except Exception as ex:
+        log.error("Error while processing DbUserRequest '%s:%s': %s", spec.namespace, spec.name, ex)
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug("Trace:\n%s", traceback.format_exc())
+        update_request_status(spec.namespace, spec.name, "Failed", f"Error while trying to process: {ex}")
 
 def watch_user_requests():
-    log.info("Watching DB user requests")
+    log.info("Waiting for informer caches to sync")
+    secret_informer.synced.wait()
+    request_informer.synced.wait()
+    log.info("Processing DB user requests")
+    executor = ThreadPoolExecutor(max_workers=HANDLER_CONCURRENCY, thread_name_prefix="RequestHandler")
     try:
-        for event in create_custom_object_watch("dbuserrequests"):
+        while not shutdown_event.is_set():
+            event = request_queue.get()
+            if event is None:
+                break
             try:
                 # TODO: Move isInstance logic to validation
-                # TODO: Parse reqeust as object an pass that to make life easier
                 if not isinstance(event, dict):
-                    log.warning(f"Received non-dict event: {event}. Skipping.")
+                    log.warning("Received non-dict event: %s. Skipping.", event)
                     continue
                 event_type = event.get('type')
-                if event_type == 'ADDED':
-                    db_user_request = event.get('object', {})
-                    if db_user_request.get('status', {}).get('phase', 'UNSET') != "Pending":
-                        log.debug(f"Not processing DBUR '{db_user_request.get('metadata', {}).get('namespace')}:{db_user_request.get('metadata', {}).get('name')}', as state is '{db_user_request.get('status', {}).get('phase', 'UNSET')}' and not 'Pending'")
-                        continue
-                    if not isinstance(db_user_request, dict):
-                        log.warning(f"Received non-dict db_user_request: {db_user_request}. Skipping.")
-                        continue
-                    source_name = db_user_request.get('metadata', {}).get('name')
-                    source_namespace = db_user_request.get('metadata', {}).get('namespace')
-                    log.info(f"New DbUserRequest created with name '{source_name}' in '{source_namespace}'. Trying to process")
-                    try:
-                        validate_user_request(db_user_request)
-                    except Exception as exc:
-                        log.error(f"Validation failed for request with name '{source_name}' in '{source_namespace}': {exc}. Will ignore request.")
-                        continue
-
-                    # TODO: Also checkk if the secret already exists. Creation order is secret -> dbuser -> delete request!
-                    if find_existing_secret(db_user_request.get('spec', {}).get('secret_name'), db_user_request.get('metadata', {}).get('namespace')):
-                        msg = f"Secret with name '{db_user_request.get('spec', {}).get('secret_name')}' already exists, skipping creating of new DB/User. Will skip request."
-                        log.info(msg)
-                        update_request_status(db_user_request, "Fulfilled", msg)
-                    else:
-                        password = generate_simple_password()
-                        db_name_and_username = call_create_script(db_user_request, password)
-                        create_secret_for_request(db_user_request, password)
-                        msg = f"DbUser for DB {db_name_and_username} with username {db_name_and_username} successfully created. Credentials stored in secret {db_user_request.get('spec', {}).get('secret_name')}."
-                        log.info(msg)
-                        update_request_status(db_user_request, "Fulfilled", msg)
+                db_user_request = event.get('object', {})
+                if not isinstance(db_user_request, dict):
+                    log.warning("Received non-dict db_user_request: %s. Skipping.", db_user_request)
+                    continue
+                phase = db_user_request.get('status', {}).get('phase', 'UNSET')
+                if event_type == 'DELETED' or phase != "Pending":
+                    # Once a request left Pending (or is gone), it is processed again when it is set back to Pending
+                    release_request(db_user_request.get('metadata', {}).get('uid'))
+                    if event_type != 'DELETED':
+                        log.debug("Not processing DBUR '%s:%s', as state is '%s' and not 'Pending'", db_user_request.get('metadata', {}).get('namespace'), db_user_request.get('metadata', {}).get('name'), phase)
+                    continue
+                # A request set back to Pending arrives as ADDED through the field selector, but as MODIFIED when
+                # watching unfiltered. Both are handled, claimed requests are skipped below
+                if event_type not in ('ADDED', 'MODIFIED'):
+                    continue
+                source_name = db_user_request.get('metadata', {}).get('name')
+                source_namespace = db_user_request.get('metadata', {}).get('namespace')
+                if WATCH_NAMESPACES and source_namespace not in WATCH_NAMESPACES:
+                    log.debug("Not processing DBUR '%s:%s', as its namespace is not watched", source_namespace, source_name)
+                    continue
+                if db_user_request.get('metadata', {}).get('uid') in handled_requests:
+                    log.debug("DbUserRequest '%s:%s' is already being processed, skipping event", source_namespace, source_name)
+                    continue
+                log.info("DbUserRequest with name '%s' in '%s' is Pending. Trying to process", source_name, source_namespace)
+                try:
+                    spec = validate_user_request(db_user_request)
+                except Exception as exc:
+                    log.error("Validation failed for request with name '%s' in '%s': %s. Will ignore request.", source_name, source_namespace, exc)
+                    continue
+                claim_request(spec.uid)
+
+                # The DB script takes seconds, so run it on a worker while the next events are validated
+                executor.submit(process_request, spec)
 
             except Exception as ex:
-                log.error(f"Error while in event processing loop: {ex}. Trying to continue.")
-                log.debug(f"Trace:\n{traceback.format_exc()}")
-                update_request_status(event.get('object', {}), "Failed", f"Error while trying to process: {ex}")
+                log.error("Error while in event processing loop: %s. Trying to continue.", ex)
+                if log.isEnabledFor(logging.DEBUG):
+                    log.debug("Trace:\n%s", traceback.format_exc())
+                metadata_obj = event.get('object', {}).get('metadata', {})
+                update_request_status(metadata_obj.get('namespace'), metadata_obj.get('name'), "Failed", f"Error while trying to process: {ex}")
     except Exception as e:
         raise Exception(f"Error while trying to loop over events: {e}")
+    finally:
+        # Requests already being processed are finished. Queued ones stay Pending and are picked up after a restart
+        executor.shutdown(cancel_futures=True)
+
+DB_NAME_CHARS = frozenset(string.ascii_lowercase + string.digits + '_')
+K8S_RESOURCE_NAME_PATTERN = regex.compile(r'^[a-z0-9]([-a-z0-9]*[a-z0-9])?(\.[a-z0-9]([-a-z0-9]*[a-z0-9])?)*\Z')
 
 def validate_db_name(db_name):
     if not db_name:
         raise Exception("DB name may not be empty")
 
-    if not regex.match(r'^[a-z0-9_]+$', db_name):
+    # A plain character class, so a set check is enough and no regex is needed
+    if not DB_NAME_CHARS.issuperset(db_name):
         raise Exception("DB name is not valid. Allowed a-z0-9_")
 
+def validate_pg_extension_name(extension):
+    # Extension names end up in the SQL fed to psql, so only plain identifiers are accepted
+    if not extension or not DB_NAME_CHARS.issuperset(extension):
+        raise Exception("Extension name is not valid. Allowed a-z0-9_")
+
 def validate_k8s_resource_name(resource_name):
-    if not regex.match(r'^[a-z0-9]([-a-z0-9]*[a-z0-9])?(\\.[a-z0-9]([-a-z0-9]*[a-z0-9])?)*$', resource_name):
+    if not K8S_RESOURCE_NAME_PATTERN.match(resource_name):
         raise Exception(f"Invalid name for a resource: \"{resource_name}\": a lowercase RFC 1123 subdomain must consist of lower case alphanumeric characters, '-' or '.', and must start and end with an alphanumeric character (e.g. 'example.com', regex used for validation is '[a-z0-9[]([-a-z0-9[]*[a-z0-9[])?(\\\\.[a-z0-9[]([-a-z0-9[]*[a-z0-9[])?)*')")
 
-def generate_db_password(length=24):
-    alphabet = string.ascii_letters + string.digits
-    password = ''.join(secrets.choice(alphabet) for _ in range(length))
-    return password
-
 def load_k8s_config():
     try:
         log.info("Attempting to load in-cluster-configuration")
         config.load_incluster_config()
         log.info("Loaded in-cluster-configuration")
     except config.ConfigException as e:
-        log.warning(f"Failed to load in-cluster-configuration. Attempting to load kube config in case the application is running locally. Cause: {e}")
+        log.warning("Failed to load in-cluster-configuration. Attempting to load kube config in case the application is running locally. Cause: %s", e)
         try:
             config.load_kube_config()
             log.info("Loaded local kubeconfig")
         except config.ConfigException as ex:
-            log.error(f"Error loading local kubeconfig configuration: {e}. Giving up.")
+            log.error("Error loading local kubeconfig configuration: %s. Giving up.", e)
             raise Exception(f"Error loading local kubernetes configuration. Exhausted all sources:\nIn-cluster-source error: {e}\nLocal config error: {ex}")
 
+core_v1_api = None
+custom_objects_api = None
+
+def init_api_clients(pool_maxsize=32):
+    """
+    Create the API clients shared by all threads.
+
+    All calls go through a single ApiClient, so its urllib3 pool keeps TCP/TLS connections to the
+    API server alive between requests instead of reconnecting for every call.
+
+    Args:
+        pool_maxsize: Maximum number of pooled connections to the API server (default: 32)
+    """
+    global core_v1_api, custom_objects_api
+    configuration = client.Configuration.get_default_copy()
+    configuration.connection_pool_maxsize = pool_maxsize
+    api_client = client.ApiClient(configuration)
+    core_v1_api = client.CoreV1Api(api_client)
+    custom_objects_api = client.CustomObjectsApi(api_client)
+
 def validate_user_request(request):
     spec = request.get('spec', {})
     db_type = spec.get('db_type')
@@ -303,8 +911,8 @@ def validate_user_request(request):
     if not (db_type and user_and_db_name and secret_name):
         raise Exception(f"Validation error: db_type, db_name and/or secret_name are missing from the request object")
 
-    if db_type.lower() != 'mariadb' and db_type.lower() != 'postgres':
-        raise Exception(f"Validation error: Unknown database type '{db_type}'. Currently supported: 'postgres' and 'mariadb'.")
+    if db_type.lower() not in DB_TYPES:
+        raise Exception(f"Validation error: Unknown database type '{db_type}'. Currently supported: {', '.join(map(repr, DB_TYPES))}.")
 
     try:
         validate_db_name(user_and_db_name)
@@ -316,57 +924,117 @@ def validate_user_request(request):
     except Exception as e:
         raise Exception(f"Validation error: The secret_name value '{user_and_db_name}' is invalid: {e}")
 
-shutdown_flag = False
+    if db_type.lower() == 'postgres':
+        pg_extensions = (spec.get('postgres') or {}).get('extensions')
+        if isinstance(pg_extensions, list):
+            for extension in pg_extensions:
+                try:
+                    validate_pg_extension_name(str(extension).lower())
+                except Exception as e:
+                    raise Exception(f"Validation error: The extension '{extension}' is invalid: {e}")
+
+    return normalize_request(request)
 
-def handle_sigterm(signum, frame):
-    global shutdown_flag
-    log.info("Received SIGTERM, shutting down...")
-    shutdown_flag = True
+shutdown_event = threading.Event()
 
-signal.signal(signal.SIGTERM, handle_sigterm)
+def handle_shutdown_signal(signum, frame):
+    log.info("Received %s, shutting down...", signal.Signals(signum).name)
+    shutdown_event.set()
+
+signal.signal(signal.SIGTERM, handle_shutdown_signal)
+signal.signal(signal.SIGINT, handle_shutdown_signal)
 
 def main():
     log.info("Kubernetes external DB User manager")
     log.info("=" * 60)
 
+    if not (PG_HOST or MYSQL_HOST):
+        log.fatal("Neither PGHOST nor MYSQL_HOST is set. Exiting.")
+        sys.exit(1)
+    for db_type, db_type_info in DB_TYPES.items():
+        if not db_type_info.host:
+            log.warning("No host configured for database type '%s', requests for it will fail", db_type)
+        elif not os.access(db_type_info.script, os.X_OK):
+            log.warning("Script %s for database type '%s' is missing or not executable, requests for it will fail", db_type_info.script, db_type)
+
     try:
         log.info("Loading configuration")
         load_k8s_config()
+        init_api_clients()
     except Exception as e:
-        log.fatal(f"Failed to load configuration. Exiting. Cause: {e}")
+        log.fatal("Failed to load configuration. Exiting. Cause: %s", e)
         sys.exit(1)
 
-    log.info("Starting CRD watcher threads")
+    if PIN_CPU:
+        if pin_cpu_error is None:
+            log.info("Pinned controller to CPU %s", PIN_CPU)
+        else:
+            log.warning("Could not pin controller to CPU '%s': %s", PIN_CPU, pin_cpu_error)
 
-    # Start watching for both DbUserRequest and DbUser resources in separate threads
+    log.info("Starting informers and CRD watcher threads")
+
+    global request_informer, secret_informer, status_writer
+    status_writer = WriteBatcher(patch_request_status, on_give_up=release_request_of_status)
+    request_informer = InformerCache(
+        "dbuserrequests",
+        # Positional, as the name of the plural parameter differs between kubernetes client versions
+        functools.partial(custom_objects_api.list_custom_object_for_all_namespaces, "notepass.de", "v1", "dbuserrequests"),
+        transform=prune_request,
+        event_queue=request_queue,
+        # Only Pending requests need work. Needs the selectable field declared in the CRD (Kubernetes 1.31+)
+        field_selector="status.phase=Pending",
+        # Lets several controller instances split the requests of a cluster between them
+        label_selector=os.environ.get('LABEL_SELECTOR')
+    )
+    secret_informer = InformerCache(
+        "secrets",
+        core_v1_api.list_secret_for_all_namespaces,
+        transform=secret_resource_version_only,
+        watch_list=True,
+        # Only the metadata of the secrets is needed, so the API server does not send their data field. A list converts
+        # into PartialObjectMetadataList, the objects of a watch into PartialObjectMetadata
+        list_headers={"Accept": "application/json;as=PartialObjectMetadataList;g=meta.k8s.io;v=v1,application/json"},
+        watch_headers={"Accept": "application/json;as=PartialObjectMetadata;g=meta.k8s.io;v=v1,application/json"}
+    )
+
+    # Start the informers and the DbUserRequest processor in separate threads
     try:
-        # Create threads for both watchers
-        db_user_request_thread = threading.Thread(
-            target=watch_user_requests,
-            daemon=True,
-            name="DbUserRequestWatcher"
-        )
+        # The processor and the status writer are joined on shutdown, so a request is never abandoned
+        # between creating the DB user, storing its secret and reporting the result
+        writer_thread = threading.Thread(target=status_writer.run, name="StatusWriter")
+        watcher_thread = threading.Thread(target=watch_user_requests, name="DbUserRequestWatcher")
+        threads = [
+            writer_thread,
+            threading.Thread(target=secret_informer.run, daemon=True, name="SecretInformer"),
+            threading.Thread(target=request_informer.run, daemon=True, name="DbUserRequestInformer"),
+            watcher_thread
+        ]
 
         try:
-            db_user_request_thread.start()
+            for thread in threads:
+                thread.start()
         except Exception as e:
-            log.fatal(f"Failed to start thread. Exiting. Cause: {e}")
+            log.fatal("Failed to start thread. Exiting. Cause: %s", e)
             sys.exit(2)
 
         log.info("Watcher started successfully")
 
-        # Keep the main thread alive, exit immediately on shutdown_flag
-        while not shutdown_flag:
-            time.sleep(1)
+        # Keep the main thread blocked until SIGTERM or SIGINT sets the shutdown event
+        shutdown_event.wait()
 
-        log.info("Main loop exiting due to shutdown flag.")
+        log.info("Main loop exiting due to shutdown event.")
+        request_informer.stop()
+        secret_informer.stop()
+        # Wake the processor if it is waiting for events. A request already in progress is finished first
+        request_queue.put(None)
+        watcher_thread.join()
+        status_writer.stop()
+        writer_thread.join()
+        log.info("Shutdown complete")
         sys.exit(0)
 
-    except KeyboardInterrupt:
-        log.info("Shutting down gracefully...")
-        sys.exit(0)
     except Exception as e:
-        log.fatal(f"Fatal error in execution: {e}")
+        log.fatal("Fatal error in execution: %s", e)
         sys.exit(1)
 
 if __name__ == "__main__":